@@ -1,15 +1,20 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 import os
 import asyncio
 from dotenv import load_dotenv
 import json
 
+from config import Config
+
 # Import our services
 from services.whatsapp_api import WhatsAppAPI
 from services.ai_manager import AIManager
 from services.drive_storage import DriveStorage
 from services.file_processor import FileProcessor
 from services.knowledge_base import KnowledgeBase
+from services.embeddings import get_embedding_backend
+from services.metrics import REGISTRY, span, SlowRequestProfiler
+from services.admission import AdmissionController
 
 load_dotenv()
 
@@ -24,9 +29,28 @@ whatsapp_api = WhatsAppAPI(
     os.getenv('WHATSAPP_PHONE_NUMBER_ID')
 )
 
+embedding_backend = get_embedding_backend(
+    Config.EMBEDDING_BACKEND,
+    onnx_dir=Config.EMBEDDING_ONNX_DIR,
+    num_threads=Config.EMBEDDING_THREADS
+)
+
+profiler = SlowRequestProfiler(Config.SLOW_REQUEST_PROFILE_MS)
+
 # Store active knowledge bases per user
 user_knowledge_bases = {}
 
+MESSAGES_TOTAL = REGISTRY.counter(
+    'whatsapp_bot_messages_total', 'Messages handled, by type and outcome', ['type', 'outcome'])
+MESSAGE_SECONDS = REGISTRY.histogram(
+    'whatsapp_bot_message_seconds', 'End-to-end message handling time', ['type'])
+MESSAGES_IN_FLIGHT = REGISTRY.gauge(
+    'whatsapp_bot_messages_in_flight', 'Messages currently being handled')
+KB_CACHE_REQUESTS = REGISTRY.counter(
+    'whatsapp_bot_kb_cache_requests_total', 'Knowledge base cache lookups', ['result'])
+KB_CACHE_SIZE = REGISTRY.gauge(
+    'whatsapp_bot_kb_cache_size', 'Knowledge bases held in memory')
+
 class WhatsAppBot:
     def __init__(self):
         self.conversations = {}
@@ -34,24 +58,40 @@ class WhatsAppBot:
     def get_user_kb(self, user_id):
         """Get or create knowledge base for user"""
         if user_id not in user_knowledge_bases:
-            kb = KnowledgeBase(drive_storage)
+            KB_CACHE_REQUESTS.inc(result='miss')
+            kb = KnowledgeBase(drive_storage, embedding_backend)
             kb.load_from_drive(user_id)  # Try to load existing
             user_knowledge_bases[user_id] = kb
+            KB_CACHE_SIZE.set(len(user_knowledge_bases))
+        else:
+            KB_CACHE_REQUESTS.inc(result='hit')
         return user_knowledge_bases[user_id]
     
     async def handle_message(self, message_data):
         """Handle incoming WhatsApp message"""
+        message_type = message_data.get('type')
+        MESSAGES_IN_FLIGHT.inc()
+        try:
+            with MESSAGE_SECONDS.time(type=message_type), profiler.profile(f"{message_type} message"):
+                await self._handle_message(message_data)
+        finally:
+            MESSAGES_IN_FLIGHT.dec()
+    
+    async def _handle_message(self, message_data):
+        sender = message_data.get('from')
+        message_type = message_data.get('type')
         try:
-            sender = message_data.get('from')
             message_id = message_data.get('id')
-            message_type = message_data.get('type')
             
             # Mark as read
-            whatsapp_api.mark_message_read(message_id)
+            with span('mark_read'):
+                whatsapp_api.mark_message_read(message_id)
             
             # Load conversation context
-            conversation = drive_storage.load_conversation(sender)
-            kb = self.get_user_kb(sender)
+            with span('load_conversation'):
+                conversation = drive_storage.load_conversation(sender)
+            with span('load_knowledge_base'):
+                kb = self.get_user_kb(sender)
             
             if message_type == 'text':
                 await self.handle_text_message(sender, message_data, conversation, kb)
@@ -64,9 +104,11 @@ class WhatsAppBot:
                     sender, 
                     "I can help you with text messages, images, and documents (PDF, Word, TXT)."
                 )
+            MESSAGES_TOTAL.inc(type=message_type, outcome='ok')
         
         except Exception as e:
             print(f"Error handling message: {e}")
+            MESSAGES_TOTAL.inc(type=message_type, outcome='error')
             whatsapp_api.send_text_message(
                 sender,
                 "Sorry, I encountered an error processing your message. Please try again."
@@ -77,14 +119,16 @@ class WhatsAppBot:
         text = message_data['text']['body']
         
         # Get context from knowledge base
-        context = kb.get_context_for_query(text)
+        with span('retrieval'):
+            context = kb.get_context_for_query(text)
         
         # Add conversation history to context
         history_context = self.build_conversation_context(conversation)
         full_context = f"{context}\n\n{history_context}".strip()
         
         # Generate response
-        response, provider = await ai_manager.generate_response(text, full_context)
+        with span('generate_response'):
+            response, provider = await ai_manager.generate_response(text, full_context)
         
         # Update conversation
         conversation['history'].append({
@@ -94,10 +138,12 @@ class WhatsAppBot:
         })
         
         # Save conversation
-        drive_storage.save_conversation(sender, conversation)
+        with span('save'):
+            drive_storage.save_conversation(sender, conversation)
         
         # Send response
-        whatsapp_api.send_text_message(sender, response)
+        with span('send'):
+            whatsapp_api.send_text_message(sender, response)
     
     async def handle_image_message(self, sender, message_data, conversation, kb):
         """Handle image messages"""
@@ -106,21 +152,25 @@ class WhatsAppBot:
         filename = f"image_{message_data['timestamp']}.jpg"
         
         # Download and process image
-        image_data, mime_type = file_processor.download_whatsapp_media(media_id)
+        with span('download_media'):
+            image_data, mime_type = file_processor.download_whatsapp_media(media_id)
         
         if image_data:
-            processed_image = file_processor.process_image(image_data, filename)
+            with span('process_file'):
+                processed_image = file_processor.process_image(image_data, filename)
             
             if processed_image:
                 # Process with AI
-                description = await ai_manager.process_image(processed_image['base64'], caption)
+                with span('generate_response'):
+                    description = await ai_manager.process_image(processed_image['base64'], caption)
                 
                 # Add to knowledge base
-                kb.add_document(description, {
-                    'type': 'image',
-                    'filename': filename,
-                    'file_id': processed_image['file_id']
-                })
+                with span('index_document'):
+                    kb.add_document(description, {
+                        'type': 'image',
+                        'filename': filename,
+                        'file_id': processed_image['file_id']
+                    })
                 
                 # Update conversation
                 conversation['documents'] = conversation.get('documents', [])
@@ -132,16 +182,70 @@ class WhatsAppBot:
                     'mime_type': mime_type
                 })
                 
-                drive_storage.save_conversation(sender, conversation)
-                kb.save_to_drive(sender)
+                with span('save'):
+                    drive_storage.save_conversation(sender, conversation)
+                    kb.save_to_drive(sender)
                 
                 response = f"📷 **Image: {filename}**\n\n**Description:**\n{description}\n\n✅ Image added to your knowledge base. You can now ask questions about it!"
-                whatsapp_api.send_text_message(sender, response)
+                with span('send'):
+                    whatsapp_api.send_text_message(sender, response)
             else:
                 whatsapp_api.send_text_message(sender, f"Sorry, I couldn't extract text from {filename}.")
         else:
             whatsapp_api.send_text_message(sender, "Sorry, I couldn't download this document.")
     
+    async def handle_document_message(self, sender, message_data, conversation, kb):
+        """Handle document messages"""
+        media_id = message_data['document']['id']
+        filename = message_data['document'].get('filename', f"document_{message_data['timestamp']}")
+        
+        # Download and process document
+        with span('download_media'):
+            doc_data, mime_type = file_processor.download_whatsapp_media(media_id)
+        
+        if not doc_data:
+            whatsapp_api.send_text_message(sender, "Sorry, I couldn't download this document.")
+            return
+        
+        if mime_type not in file_processor.extractable_doc_types:
+            whatsapp_api.send_text_message(
+                sender,
+                f"Sorry, {filename} is not a supported file type. I can read PDF, Word and TXT documents."
+            )
+            return
+        
+        with span('process_file'):
+            processed_doc = file_processor.process_document(doc_data, mime_type, filename)
+        
+        if not processed_doc or not processed_doc['text'].strip():
+            whatsapp_api.send_text_message(sender, f"Sorry, I couldn't extract text from {filename}.")
+            return
+        
+        # Add to knowledge base
+        with span('index_document'):
+            kb.add_document(processed_doc['text'], {
+                'type': 'document',
+                'filename': filename,
+                'file_id': processed_doc['file_id']
+            })
+        
+        # Update conversation
+        conversation['documents'] = conversation.get('documents', [])
+        conversation['documents'].append({
+            'type': 'document',
+            'filename': filename,
+            'file_id': processed_doc['file_id'],
+            'mime_type': mime_type
+        })
+        
+        with span('save'):
+            drive_storage.save_conversation(sender, conversation)
+            kb.save_to_drive(sender)
+        
+        response = f"📄 **Document: {filename}**\n\n✅ Document added to your knowledge base. You can now ask questions about it!"
+        with span('send'):
+            whatsapp_api.send_text_message(sender, response)
+    
     def build_conversation_context(self, conversation, max_exchanges=3):
         """Build conversation context from history"""
         history = conversation.get('history', [])
@@ -157,6 +261,24 @@ class WhatsAppBot:
 # Initialize bot
 bot = WhatsAppBot()
 
+# Inbound messages go through per-user rate limits and priority scheduling.
+# Its threads start on the first submit, after any gunicorn fork.
+admission_controller = AdmissionController(
+    handler=lambda message: asyncio.run(bot.handle_message(message)),
+    notify=lambda sender, text: whatsapp_api.send_text_message(sender, text),
+    workers=Config.ADMISSION_WORKERS,
+    max_requests_per_minute=Config.MAX_REQUESTS_PER_MINUTE,
+    max_queue_size=Config.MAX_QUEUE_SIZE
+)
+
+def iter_webhook_messages(data):
+    """Yield every message contained in a webhook payload"""
+    for entry in data.get('entry', []):
+        for change in entry.get('changes', []):
+            value = change.get('value', {})
+            for message in value.get('messages', []):
+                yield message
+
 @app.route('/webhook', methods=['GET', 'POST'])
 def webhook():
     if request.method == 'GET':
@@ -171,14 +293,8 @@ def webhook():
             data = request.get_json()
             
             # Process webhook data
-            for entry in data.get('entry', []):
-                for change in entry.get('changes', []):
-                    value = change.get('value', {})
-                    messages = value.get('messages', [])
-                    
-                    for message in messages:
-                        # Run async handler
-                        asyncio.create_task(bot.handle_message(message))
+            for message in iter_webhook_messages(data):
+                admission_controller.submit(message)
             
             return jsonify({'status': 'success'})
         except Exception as e:
@@ -189,6 +305,10 @@ def webhook():
 def health_check():
     return jsonify({'status': 'healthy', 'service': 'whatsapp-bot'})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
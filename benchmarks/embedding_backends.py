@@ -0,0 +1,103 @@
+"""Compare embedding backends on cold start and encode throughput
+
+Usage:
+    python benchmarks/embedding_backends.py
+    python benchmarks/embedding_backends.py --backends onnx-int8 hashing --threads 1
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.embeddings import BACKENDS, get_embedding_backend
+
+SAMPLE_SENTENCES = [
+    "The quarterly report shows revenue grew by twelve percent year over year.",
+    "Please send the signed contract back before the end of the week.",
+    "Our refund policy allows returns within thirty days of purchase.",
+    "The meeting has been moved to Thursday afternoon at three o'clock.",
+    "Customers in the northern region reported slower delivery times.",
+    "The new onboarding guide explains how to set up your workspace.",
+    "Invoices are generated automatically on the first day of each month.",
+    "Support tickets are answered within one business day on average.",
+]
+
+COLD_START_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from services.knowledge_base import KnowledgeBase
+imported = time.perf_counter()
+from services.embeddings import get_embedding_backend
+backend = get_embedding_backend({name!r}, onnx_dir={onnx_dir!r}, num_threads={threads!r})
+backend.encode(['warm up'])
+ready = time.perf_counter()
+print(imported - start, ready - start)
+"""
+
+
+def measure_cold_start(name, onnx_dir, threads):
+    """Time module import and first encode in a fresh interpreter"""
+    snippet = COLD_START_SNIPPET.format(root=ROOT, name=name, onnx_dir=onnx_dir, threads=threads)
+    result = subprocess.run(
+        [sys.executable, '-c', snippet],
+        capture_output=True, text=True, env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    output = result.stdout.split()
+    return float(output[-2]), float(output[-1])
+
+
+def measure_throughput(name, onnx_dir, threads, sentences, batch_size, rounds):
+    """Return sentences encoded per second after warm-up"""
+    backend = get_embedding_backend(name, onnx_dir=onnx_dir, num_threads=threads)
+    backend.encode(sentences[:batch_size], batch_size=batch_size)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        backend.encode(sentences, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return len(sentences) * rounds / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--sentences', type=int, default=512, help='sentences per round')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=0,
+                        help='pin math libraries to N threads for per-core numbers')
+    parser.add_argument('--onnx-dir', default=None,
+                        help='directory with model_quantized.onnx and tokenizer.json (required for onnx-int8)')
+    args = parser.parse_args()
+
+    if args.threads:
+        for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS'):
+            os.environ[var] = str(args.threads)
+        try:
+            import torch
+            torch.set_num_threads(args.threads)
+        except ImportError:
+            pass
+
+    sentences = (SAMPLE_SENTENCES * (args.sentences // len(SAMPLE_SENTENCES) + 1))[:args.sentences]
+
+    print(f"{'backend':<24}{'import (s)':>12}{'ready (s)':>12}{'sent/s':>12}")
+    for name in args.backends:
+        try:
+            import_time, ready_time = measure_cold_start(name, args.onnx_dir, args.threads)
+            rate = measure_throughput(name, args.onnx_dir, args.threads, sentences, args.batch_size, args.rounds)
+        except Exception as e:
+            print(f"{name:<24}skipped: {e}")
+            continue
+        print(f"{name:<24}{import_time:>12.3f}{ready_time:>12.3f}{rate:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""In-process stand-ins for every external service the bot talks to
+
+Each fake keeps the public interface of the real class and simulates network
+time with a blocking sleep, like the real HTTP clients do. Failures are
+injected at a configurable rate and surface the same way the real service
+would (an error dict, a None return, or an exception from the SDK client).
+"""
+import io
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from services.ai_manager import AIManager
+from services.file_processor import FileProcessor
+
+
+class InjectedError(Exception):
+    pass
+
+
+class LatencyModel:
+    """Sleep for a jittered latency and fail with probability `error_rate`
+
+    `failures` counts the failures injected so far, since the services
+    swallow most of them and the bot's own metrics never see them.
+    """
+
+    def __init__(self, mean_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=None):
+        self.mean = mean_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.failures = 0
+
+    def wait(self, operation='call'):
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.mean, self.jitter)) if self.jitter else self.mean
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.failures += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise InjectedError(f"injected failure in {operation}")
+
+
+class FakeWhatsAppAPI:
+    """Records outgoing messages instead of calling graph.facebook.com"""
+
+    def __init__(self, access_token=None, phone_number_id=None, latency=None):
+        self.access_token = access_token
+        self.phone_number_id = phone_number_id
+        self.latency = latency or LatencyModel()
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send_text_message(self, to, message):
+        """Send text message"""
+        return self._send_request({"messaging_product": "whatsapp", "to": to, "text": {"body": message}})
+
+    def send_document_message(self, to, message, document_id):
+        """Send document with caption"""
+        return self._send_request({
+            "messaging_product": "whatsapp",
+            "to": to,
+            "type": "document",
+            "document": {"id": document_id, "caption": message}
+        })
+
+    def mark_message_read(self, message_id):
+        """Mark message as read"""
+        return self._send_request({"messaging_product": "whatsapp", "status": "read", "message_id": message_id})
+
+    def _send_request(self, data):
+        try:
+            self.latency.wait('whatsapp')
+        except InjectedError as e:
+            return {"error": str(e)}
+        with self._lock:
+            self.sent.append(data)
+        return {"messaging_product": "whatsapp", "messages": [{"id": f"wamid.fake{len(self.sent)}"}]}
+
+
+class FakeDriveStorage:
+    """Keeps uploaded files in memory instead of Google Drive
+
+    Only the latest upload per filename is kept, so the fake's own storage
+    doesn't inflate the load test's memory figures.
+    """
+
+    def __init__(self, latency=None):
+        self.latency = latency or LatencyModel()
+        self.folder_id = 'fake-folder'
+        self.files = {}
+        self.names = {}
+        self._uploads = 0
+        self._lock = threading.Lock()
+
+    def upload_file(self, file_content, filename, mime_type='application/octet-stream'):
+        """Upload file to Google Drive and return file ID"""
+        try:
+            self.latency.wait('drive upload')
+        except InjectedError as e:
+            print(f"Error uploading file: {e}")
+            return None
+        with self._lock:
+            self._uploads += 1
+            file_id = f"fake-{self._uploads}"
+            self.files.pop(self.names.get(filename), None)
+            self.files[file_id] = bytes(file_content)
+            self.names[filename] = file_id
+        return file_id
+
+    def download_file(self, file_id):
+        """Download file from Google Drive"""
+        try:
+            self.latency.wait('drive download')
+        except InjectedError as e:
+            print(f"Error downloading file: {e}")
+            return None
+        return self.files.get(file_id)
+
+    def save_conversation(self, user_id, conversation_data):
+        """Save conversation context to Drive"""
+        content = json.dumps(conversation_data, indent=2).encode('utf-8')
+        return self.upload_file(content, f"conversation_{user_id}.json", 'application/json')
+
+    def load_conversation(self, user_id):
+        """Load conversation context from Drive"""
+        try:
+            self.latency.wait('drive list')
+            file_id = self.names.get(f"conversation_{user_id}.json")
+            if file_id:
+                file_content = self.download_file(file_id)
+                return json.loads(file_content.decode('utf-8'))
+            return {"history": [], "documents": [], "knowledge_base": []}
+        except Exception as e:
+            print(f"Error loading conversation: {e}")
+            return {"history": [], "documents": [], "knowledge_base": []}
+
+
+class FakeChatClient:
+    """Mimics the Groq/Together `client.chat.completions.create` surface"""
+
+    def __init__(self, provider, latency=None):
+        self.provider = provider
+        self.latency = latency or LatencyModel()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, model, max_tokens=1000, temperature=0.7):
+        self.latency.wait(self.provider)
+        content = f"[{self.provider}:{model}] " + _fake_answer(messages[-1]['content'])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FakeCohereClient:
+    """Mimics `cohere.Client.chat`"""
+
+    def __init__(self, latency=None):
+        self.latency = latency or LatencyModel()
+
+    def chat(self, message, model, max_tokens=1000):
+        self.latency.wait('cohere')
+        return SimpleNamespace(text=f"[cohere:{model}] " + _fake_answer(message))
+
+
+def _fake_answer(prompt):
+    if isinstance(prompt, list):
+        prompt = ' '.join(part.get('text', '') for part in prompt if isinstance(part, dict))
+    words = prompt.split()
+    return "Here is what I found. " + ' '.join(words[-40:])
+
+
+def fake_ai_manager(latency=None, max_per_minute=None):
+    """AIManager wired to fake provider clients sharing one latency model"""
+    latency = latency or LatencyModel()
+    manager = AIManager(clients={
+        'groq': FakeChatClient('groq', latency),
+        'together': FakeChatClient('together', latency),
+        'cohere': FakeCohereClient(latency),
+    })
+    if max_per_minute:
+        for provider in manager.providers.values():
+            provider['rate_limit']['max_per_minute'] = max_per_minute
+    return manager
+
+
+class FakeFileProcessor(FileProcessor):
+    """FileProcessor whose media downloads are served from memory
+
+    Payloads registered with `add_media` are returned for their media id, so
+    the real image and document processing code still runs.
+    """
+
+    def __init__(self, whatsapp_token, drive_storage, latency=None):
+        super().__init__(whatsapp_token, drive_storage)
+        self.latency = latency or LatencyModel()
+        self.media = {}
+
+    def add_media(self, media_id, content, mime_type):
+        self.media[media_id] = (content, mime_type)
+
+    def download_whatsapp_media(self, media_id):
+        """Download media from WhatsApp servers"""
+        try:
+            self.latency.wait('media download')
+        except InjectedError as e:
+            print(f"Error downloading media: {e}")
+            return None, None
+        return self.media.get(media_id, (None, None))
+
+
+def make_image(width=800, height=600, seed=0):
+    """Build a JPEG of the given size with some noise so it doesn't compress to nothing"""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    image = Image.new('RGB', (width, height), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    pixels = image.load()
+    for _ in range(width * height // 50):
+        pixels[rng.randrange(width), rng.randrange(height)] = (rng.randrange(256),) * 3
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=85)
+    return buffered.getvalue()
@@ -0,0 +1,238 @@
+"""End-to-end load test of the message pipeline against local fakes
+
+Replays generated webhook traffic through WhatsAppBot.handle_message with
+WhatsApp, Google Drive, media downloads and the AI providers replaced by
+in-process fakes, then reports throughput, latency percentiles and memory
+for each user count. No network access is needed.
+
+Usage:
+    python benchmarks/load_test.py --users 1 10 50 --messages-per-user 5
+    python benchmarks/load_test.py --llm-latency 800 --error-rate 0.02 --json results.json
+    python benchmarks/load_test.py --admission --rate 20 --mix text=0.5,document=0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('EMBEDDING_BACKEND', 'hashing')
+
+import services.ai_manager
+import services.drive_storage
+import services.file_processor
+import services.whatsapp_api
+from services.ai_manager import PROVIDER_ERRORS
+from benchmarks.fakes import (
+    FakeDriveStorage, FakeFileProcessor, FakeWhatsAppAPI, LatencyModel, fake_ai_manager
+)
+from benchmarks.traffic import WebhookTrafficGenerator
+from services.admission import ADMISSION_DECISIONS, AdmissionController
+
+
+def import_app():
+    """Import app.py with its module-level services built from fakes"""
+    services.drive_storage.DriveStorage = FakeDriveStorage
+    services.whatsapp_api.WhatsAppAPI = FakeWhatsAppAPI
+    services.ai_manager.AIManager = fake_ai_manager
+    services.file_processor.FileProcessor = FakeFileProcessor
+    import app
+    return app
+
+
+def install_fakes(app, args, seed):
+    """Give the app fresh fakes and empty caches for one run
+
+    Returns the fake media server and every latency model in use, so the
+    run can report how many failures were injected.
+    """
+    models = []
+
+    def latency(mean_ms):
+        nonlocal seed
+        seed += 1
+        models.append(LatencyModel(mean_ms, mean_ms * args.jitter, args.error_rate, seed))
+        return models[-1]
+
+    drive = FakeDriveStorage(latency(args.drive_latency))
+    app.drive_storage = drive
+    app.whatsapp_api = FakeWhatsAppAPI(latency=latency(args.whatsapp_latency))
+    app.ai_manager = fake_ai_manager(latency(args.llm_latency), args.provider_rpm)
+    app.file_processor = FakeFileProcessor(None, drive, latency(args.whatsapp_latency))
+    app.user_knowledge_bases.clear()
+    return app.file_processor, models
+
+
+def rss_mb():
+    """Resident set size of this process in MB (Linux)"""
+    with open('/proc/self/statm') as statm:
+        pages = int(statm.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def error_counts(app):
+    """Handler-level and AI provider failures recorded by the bot's metrics"""
+    handler = sum(app.MESSAGES_TOTAL.get(type=t, outcome='error') for t in ('text', 'image', 'document'))
+    provider = sum(PROVIDER_ERRORS.get(provider=p) for p in ('groq', 'together', 'cohere', 'none'))
+    return handler, provider
+
+
+def expired_count():
+    """Queued messages the admission controller dropped past their deadline"""
+    return sum(ADMISSION_DECISIONS.get(priority=p, decision='expired') for p in ('text', 'image', 'document'))
+
+
+def run_once(app, users, args):
+    file_processor, latency_models = install_fakes(app, args, seed=args.seed * 1000 + users)
+    generator = WebhookTrafficGenerator(
+        users, mix=args.mix, seed=args.seed, file_processor=file_processor
+    )
+    payloads = list(generator.generate(args.messages_per_user))
+
+    latencies = {}
+    arrivals = {}
+    decisions = {}
+    lock = threading.Lock()
+
+    def handle(message):
+        asyncio.run(app.bot.handle_message(message))
+        elapsed = time.perf_counter() - arrivals[message['id']]
+        with lock:
+            latencies.setdefault(message['type'], []).append(elapsed)
+
+    if args.admission:
+        # Same controller the webhook uses, sized like the thread pool below
+        controller = AdmissionController(
+            handler=handle,
+            notify=lambda sender, text: app.whatsapp_api.send_text_message(sender, text),
+            workers=args.workers,
+            max_requests_per_minute=app.Config.MAX_REQUESTS_PER_MINUTE,
+            max_queue_size=app.Config.MAX_QUEUE_SIZE
+        )
+        controller.start()
+        executor = None
+    else:
+        executor = ThreadPoolExecutor(max_workers=args.workers)
+
+    handler_errors_before, provider_errors_before = error_counts(app)
+    expired_before = expired_count()
+    rss_before = rss_mb()
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    for index, payload in enumerate(payloads):
+        if args.rate:
+            # Open-loop arrivals at a fixed rate, regardless of backlog
+            delay = start + index / args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        for message in app.iter_webhook_messages(payload):
+            arrivals[message['id']] = time.perf_counter()
+            if executor:
+                executor.submit(handle, message)
+            else:
+                decision = controller.submit(message)
+                decisions[decision] = decisions.get(decision, 0) + 1
+    if executor:
+        executor.shutdown(wait=True)
+    else:
+        controller.drain()
+        controller.stop()
+    elapsed = time.perf_counter() - start
+
+    traced_peak = None
+    if args.tracemalloc:
+        traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    handler_errors, provider_errors = error_counts(app)
+    expired = int(expired_count() - expired_before)
+    if expired:
+        decisions['expired'] = expired
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        'users': users,
+        'messages': len(all_latencies),
+        'injected_failures': sum(model.failures for model in latency_models),
+        'handler_errors': int(handler_errors - handler_errors_before),
+        'provider_errors': int(provider_errors - provider_errors_before),
+        'seconds': elapsed,
+        'throughput': len(all_latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(all_latencies, 50) * 1000,
+        'p95_ms': percentile(all_latencies, 95) * 1000,
+        'p99_ms': percentile(all_latencies, 99) * 1000,
+        'by_type_p95_ms': {t: percentile(v, 95) * 1000 for t, v in sorted(latencies.items())},
+        'admission': decisions,
+        'rss_mb': rss_mb(),
+        'rss_delta_mb': rss_mb() - rss_before,
+        'traced_peak_mb': traced_peak,
+    }
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        message_type, share = part.split('=')
+        mix[message_type.strip()] = float(share)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--messages-per-user', type=int, default=5)
+    parser.add_argument('--mix', type=parse_mix, default='text=0.8,image=0.1,document=0.1',
+                        help='message type shares, e.g. text=0.8,image=0.1,document=0.1')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent handler threads')
+    parser.add_argument('--rate', type=float, default=0, help='arrivals per second (0 = all at once)')
+    parser.add_argument('--whatsapp-latency', type=float, default=80, help='ms per Graph API call')
+    parser.add_argument('--drive-latency', type=float, default=150, help='ms per Drive call')
+    parser.add_argument('--llm-latency', type=float, default=600, help='ms per AI provider call')
+    parser.add_argument('--jitter', type=float, default=0.2, help='latency std dev as a fraction of the mean')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='failure probability per fake call')
+    parser.add_argument('--provider-rpm', type=int, default=0,
+                        help='override AI provider requests/minute limits (0 = keep configured limits)')
+    parser.add_argument('--admission', action='store_true',
+                        help='route messages through the admission controller instead of a plain thread pool')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tracemalloc', action='store_true', help='also report peak Python allocations (slower)')
+    parser.add_argument('--json', help='write results to this file for regression comparisons')
+    args = parser.parse_args()
+
+    app = import_app()
+    results = []
+    print(f"{'users':>6}{'msgs':>7}{'injected':>10}{'ai err':>8}{'msg err':>9}{'shed':>6}{'msg/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'text p95':>10}{'rss MB':>9}")
+    for users in args.users:
+        result = run_once(app, users, args)
+        results.append(result)
+        shed = sum(result['admission'].get(d, 0) for d in ('shed', 'rate_limited', 'expired'))
+        text_p95 = result['by_type_p95_ms'].get('text', 0.0)
+        print(f"{result['users']:>6}{result['messages']:>7}{result['injected_failures']:>10}"
+              f"{result['provider_errors']:>8}{result['handler_errors']:>9}{shed:>6}{result['throughput']:>9.2f}"
+              f"{result['p50_ms']:>9.0f}{result['p95_ms']:>9.0f}{result['p99_ms']:>9.0f}"
+              f"{text_p95:>10.0f}{result['rss_mb']:>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({'config': {k: v for k, v in vars(args).items() if k != 'json'}, 'results': results},
+                      output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
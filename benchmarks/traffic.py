@@ -0,0 +1,112 @@
+"""Generate WhatsApp Cloud API webhook payloads with a realistic message mix"""
+import random
+import time
+
+QUESTIONS = [
+    "Hi, can you help me?",
+    "What does the contract say about the termination notice period?",
+    "Summarize the main points of the document I sent yesterday.",
+    "How much was spent on marketing last quarter?",
+    "Who is responsible for approving refunds?",
+    "Explain the difference between the basic and premium plans.",
+    "What time does the office open on Saturdays?",
+    "Can you list the action items from the meeting notes?",
+    "Thanks!",
+    "Is there anything in my files about the delivery schedule?",
+]
+
+DOCUMENT_PARAGRAPHS = [
+    "This agreement may be terminated by either party with thirty days written notice.",
+    "Refunds above five hundred dollars must be approved by the finance manager.",
+    "Marketing spend for the quarter came to forty two thousand dollars, mostly on social ads.",
+    "The office is open from nine to five on weekdays and from ten to two on Saturdays.",
+    "Deliveries to the northern region are scheduled every Tuesday and Friday morning.",
+    "Action items: update the pricing page, hire a support engineer, renew the lease.",
+    "The premium plan includes priority support and unlimited document uploads.",
+]
+
+DEFAULT_MIX = {'text': 0.8, 'image': 0.1, 'document': 0.1}
+
+
+class WebhookTrafficGenerator:
+    """Builds webhook payloads for `users` simulated senders
+
+    `mix` maps message type to its share of traffic. Media bodies are
+    registered on `file_processor` (a FakeFileProcessor) so the bot can
+    download them. Generation is deterministic for a given seed.
+    """
+
+    def __init__(self, users, mix=None, seed=0, file_processor=None, image_size=(800, 600),
+                 document_paragraphs=40):
+        self.users = [f"1555{index:07d}" for index in range(users)]
+        self.mix = mix or DEFAULT_MIX
+        self.rng = random.Random(seed)
+        self.file_processor = file_processor
+        self.image_size = image_size
+        self.document_paragraphs = document_paragraphs
+        self._counter = 0
+        self._image = None
+
+    def _next_id(self):
+        self._counter += 1
+        return self._counter
+
+    def _image_bytes(self):
+        # Encoding a JPEG is slow, so every image message shares one body
+        if self._image is None:
+            from benchmarks.fakes import make_image
+            self._image = make_image(*self.image_size)
+        return self._image
+
+    def _document_bytes(self):
+        paragraphs = [self.rng.choice(DOCUMENT_PARAGRAPHS) for _ in range(self.document_paragraphs)]
+        return '\n'.join(paragraphs).encode('utf-8')
+
+    def message(self, sender, message_type):
+        """Build one inbound message of `message_type` from `sender`"""
+        number = self._next_id()
+        message = {
+            'from': sender,
+            'id': f"wamid.bench{number}",
+            'timestamp': str(int(time.time()) + number),
+            'type': message_type,
+        }
+        if message_type == 'text':
+            message['text'] = {'body': self.rng.choice(QUESTIONS)}
+        elif message_type == 'image':
+            media_id = f"media-image-{number}"
+            if self.file_processor:
+                self.file_processor.add_media(media_id, self._image_bytes(), 'image/jpeg')
+            message['image'] = {'id': media_id, 'mime_type': 'image/jpeg', 'caption': 'What is in this picture?'}
+        elif message_type == 'document':
+            media_id = f"media-doc-{number}"
+            if self.file_processor:
+                self.file_processor.add_media(media_id, self._document_bytes(), 'text/plain')
+            message['document'] = {'id': media_id, 'mime_type': 'text/plain', 'filename': f"notes_{number}.txt"}
+        return message
+
+    def payload(self, messages):
+        """Wrap messages in the webhook envelope Meta posts to /webhook"""
+        return {
+            'object': 'whatsapp_business_account',
+            'entry': [{
+                'id': 'bench-account',
+                'changes': [{
+                    'field': 'messages',
+                    'value': {
+                        'messaging_product': 'whatsapp',
+                        'metadata': {'phone_number_id': 'bench-phone'},
+                        'messages': messages,
+                    }
+                }]
+            }]
+        }
+
+    def generate(self, messages_per_user):
+        """Yield one payload per message, interleaving users in random order"""
+        types, weights = zip(*self.mix.items())
+        schedule = [sender for sender in self.users for _ in range(messages_per_user)]
+        self.rng.shuffle(schedule)
+        for sender in schedule:
+            message_type = self.rng.choices(types, weights)[0]
+            yield self.payload([self.message(sender, message_type)])
@@ -18,11 +18,25 @@ class Config:
     # Google Drive
     GOOGLE_DRIVE_FOLDER_ID = os.getenv('GOOGLE_DRIVE_FOLDER_ID')
     
+    # Embeddings: sentence-transformers, onnx-int8 or hashing
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'sentence-transformers')
+    EMBEDDING_ONNX_DIR = os.getenv(
+        'EMBEDDING_ONNX_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'all-MiniLM-L6-v2')
+    )
+    EMBEDDING_THREADS = int(os.getenv('EMBEDDING_THREADS', 0))
+    
     # App Settings
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
     PORT = int(os.getenv('PORT', 5000))
     
+    # Observability: print sampled stacks for requests slower than this (0 = off)
+    SLOW_REQUEST_PROFILE_MS = float(os.getenv('SLOW_REQUEST_PROFILE_MS', 0))
+    
     # Rate Limiting
     MAX_REQUESTS_PER_MINUTE = 50
+    # At least 2, so a text reply never waits behind document ingestion
+    ADMISSION_WORKERS = int(os.getenv('ADMISSION_WORKERS', 4))
+    MAX_QUEUE_SIZE = int(os.getenv('MAX_QUEUE_SIZE', 500))
     MAX_FILE_SIZE_MB = 10
     MAX_CONTEXT_LENGTH = 3000
\ No newline at end of file
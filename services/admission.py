@@ -0,0 +1,348 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from services.metrics import REGISTRY
+
+# Weighted priority classes. Text is interactive and gets most of the worker
+# time; image and document ingestion still progresses but never starves it.
+# `busy_after` is the expected wait (seconds) past which the sender gets a
+# "busy, queued" notice; `deadline` is when a queued message is dropped.
+# Non-interactive classes together never hold more than `workers - 1`
+# workers, so one is always free for text as long as workers >= 2 (with a
+# single worker, a document can still hold it).
+PRIORITY_CLASSES = {
+    'text': {'weight': 6, 'busy_after': 5, 'deadline': 30, 'interactive': True},
+    'image': {'weight': 3, 'busy_after': 15, 'deadline': 120, 'interactive': False},
+    'document': {'weight': 1, 'busy_after': 30, 'deadline': 300, 'interactive': False},
+}
+
+BUSY_MESSAGE = "⏳ I'm handling a lot of messages right now. Yours is queued and I'll reply shortly."
+SHED_MESSAGE = "⚠️ I'm overloaded right now and couldn't process your message. Please send it again in a few minutes."
+RATE_LIMITED_MESSAGE = "You're sending messages faster than I can answer. Please wait a minute and try again."
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    'whatsapp_bot_queue_depth', 'Messages waiting for a worker', ['priority'])
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    'whatsapp_bot_queue_wait_seconds', 'Time messages spent queued before handling', ['priority'])
+ADMISSION_DECISIONS = REGISTRY.counter(
+    'whatsapp_bot_admission_total', 'Admission decisions for inbound messages', ['priority', 'decision'])
+NOTICES_DROPPED = REGISTRY.counter(
+    'whatsapp_bot_notices_dropped_total', 'Busy/shed notices dropped because the notice queue was full')
+
+
+class TokenBucket:
+    """Allows `capacity` requests per `period` seconds, refilled continuously"""
+
+    def __init__(self, capacity, period=60.0, now=None):
+        self.capacity = float(capacity)
+        self.period = period
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def try_consume(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def is_idle(self, now):
+        """True once the bucket has refilled completely since its last use"""
+        return now - self.updated >= self.period
+
+
+class AdmissionController:
+    """Per-user rate limiting, priority scheduling and load shedding
+
+    `handler(message)` is run on one of `workers` threads for every admitted
+    message. `notify(sender, text)` sends the cheap busy/shed replies from a
+    separate thread, so submit() never waits on the WhatsApp API. Messages
+    are picked from the priority classes by smooth weighted round robin, and
+    a message is shed instead of queued when its expected wait is already
+    past its class deadline.
+
+    Threads start on the first submit() in each process, which keeps the
+    controller usable when the app is imported before a fork (gunicorn
+    --preload).
+    """
+
+    def __init__(self, handler, notify, workers=4, max_requests_per_minute=50,
+                 max_queue_size=500, classes=None, clock=time.monotonic, max_pending_notices=1000):
+        self.handler = handler
+        self.notify = notify
+        self.workers = workers
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_queue_size = max_queue_size
+        self.classes = classes or PRIORITY_CLASSES
+        self.clock = clock
+        # Workers the non-interactive classes may hold at once; no worker is
+        # reserved for text when there is only one
+        self.bulk_workers = max(1, workers - 1)
+
+        self._queues = {name: deque() for name in self.classes}
+        self._current_weight = {name: 0 for name in self.classes}
+        # Exponentially weighted average handling time per class, in seconds
+        self._service_time = {name: 1.0 for name in self.classes}
+        self._in_flight = {}
+        self._busy_senders = set()
+        self._bulk_busy = 0
+        self._buckets = {}
+        self._last_prune = clock()
+        self._rate_limit_notified = set()
+        self._overload_notified = set()
+        self._notices = queue.Queue(maxsize=max_pending_notices)
+        self._threads = []
+        self._running = False
+        self._started_pid = None
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+
+    def classify(self, message):
+        """Priority class for a message; unknown types get the cheap text path"""
+        message_type = message.get('type')
+        return message_type if message_type in self.classes else 'text'
+
+    def start(self):
+        with self._lock:
+            if self._running and self._started_pid == os.getpid():
+                return
+            # Threads don't survive a fork; a child starts its own
+            self._running = True
+            self._started_pid = os.getpid()
+            self._threads = []
+        threads = [threading.Thread(target=self._notifier, name="admission-notifier", daemon=True)]
+        for index in range(self.workers):
+            threads.append(threading.Thread(target=self._worker, name=f"admission-worker-{index}", daemon=True))
+        for thread in threads:
+            thread.start()
+        self._threads = threads
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self._started_pid = None
+            self._condition.notify_all()
+        self._notices.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def drain(self, timeout=None):
+        """Block until every queued message has been handled or shed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._in_flight or any(self._queues.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def _capacity(self, priority):
+        """(workers usable by `priority`, workers of that pool currently busy)"""
+        if self.classes[priority].get('interactive'):
+            return self.workers, len(self._in_flight)
+        return self.bulk_workers, self._bulk_busy
+
+    def _expected_wait(self, priority, now):
+        """Rough wait for a new message of `priority` given the current load
+
+        Queued classes with at least the same weight are served ahead of it;
+        lower weight classes still get their share of workers, so they count
+        in proportion to their weight. Messages already being handled add
+        their expected remaining time.
+        """
+        limit, busy = self._capacity(priority)
+        weight = self.classes[priority]['weight']
+        queued_work = 0.0
+        ahead = 0
+        for name, pending in self._queues.items():
+            if self.classes[name]['weight'] >= weight:
+                share = 1.0
+                ahead += len(pending)
+            else:
+                share = self.classes[name]['weight'] / weight
+            queued_work += len(pending) * self._service_time[name] * share
+        if not ahead and busy < limit:
+            # A worker is free and nothing of equal or higher priority is waiting
+            return 0.0
+
+        in_flight_work = sum(
+            max(0.0, self._service_time[name] - (now - started))
+            for name, started, _ in self._in_flight.values()
+        )
+        return (queued_work + in_flight_work) / limit
+
+    def _prune_buckets(self, now):
+        """Forget senders whose bucket has been idle long enough to be full"""
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        for sender in [s for s, bucket in self._buckets.items() if bucket.is_idle(now)]:
+            del self._buckets[sender]
+            self._rate_limit_notified.discard(sender)
+            self._overload_notified.discard(sender)
+
+    def _queue_notice(self, sender, text):
+        try:
+            self._notices.put_nowait((sender, text))
+        except queue.Full:
+            NOTICES_DROPPED.inc()
+
+    def submit(self, message):
+        """Admit, queue or shed an inbound message; returns the decision"""
+        if self._started_pid != os.getpid():
+            self.start()
+
+        sender = message.get('from')
+        priority = self.classify(message)
+        reply = None
+
+        with self._lock:
+            now = self.clock()
+            self._prune_buckets(now)
+            bucket = self._buckets.get(sender)
+            if bucket is None:
+                bucket = self._buckets[sender] = TokenBucket(self.max_requests_per_minute, now=now)
+
+            if not bucket.try_consume(now):
+                decision = 'rate_limited'
+                # One notice per burst; further messages are dropped silently
+                if sender not in self._rate_limit_notified:
+                    self._rate_limit_notified.add(sender)
+                    reply = RATE_LIMITED_MESSAGE
+            else:
+                self._rate_limit_notified.discard(sender)
+                expected_wait = self._expected_wait(priority, now)
+                queued = sum(len(pending) for pending in self._queues.values())
+
+                if queued >= self.max_queue_size or expected_wait > self.classes[priority]['deadline']:
+                    decision = 'shed'
+                    reply = SHED_MESSAGE
+                else:
+                    decision = 'busy' if expected_wait > self.classes[priority]['busy_after'] else 'queued'
+                    if decision == 'busy':
+                        reply = BUSY_MESSAGE
+                    self._queues[priority].append((now, message))
+                    QUEUE_DEPTH.set(len(self._queues[priority]), priority=priority)
+                    self._condition.notify()
+
+                # One overload notice per sender until the bot catches up
+                if reply:
+                    if sender in self._overload_notified:
+                        reply = None
+                    else:
+                        self._overload_notified.add(sender)
+                else:
+                    self._overload_notified.discard(sender)
+
+            if reply:
+                self._queue_notice(sender, reply)
+
+        ADMISSION_DECISIONS.inc(priority=priority, decision=decision)
+        return decision
+
+    def _next_message(self):
+        """Pick the next class by smooth weighted round robin (caller holds the lock)
+
+        Non-interactive classes are skipped while they already hold
+        `bulk_workers` workers. Within a class, messages from a sender who
+        already has one being handled are passed over, so each sender's
+        messages run one at a time and in order.
+        """
+        ready = {}
+        for name, pending in self._queues.items():
+            if not pending:
+                continue
+            if not self.classes[name].get('interactive') and self._bulk_busy >= self.bulk_workers:
+                continue
+            for index, (_, message) in enumerate(pending):
+                if message.get('from') not in self._busy_senders:
+                    ready[name] = index
+                    break
+        if not ready:
+            return None
+        total = 0
+        for name in ready:
+            self._current_weight[name] += self.classes[name]['weight']
+            total += self.classes[name]['weight']
+        chosen = max(ready, key=lambda name: self._current_weight[name])
+        self._current_weight[chosen] -= total
+        enqueued, message = self._queues[chosen][ready[chosen]]
+        del self._queues[chosen][ready[chosen]]
+        QUEUE_DEPTH.set(len(self._queues[chosen]), priority=chosen)
+
+        token = object()
+        sender = message.get('from')
+        self._in_flight[token] = (chosen, self.clock(), sender)
+        self._busy_senders.add(sender)
+        if not self.classes[chosen].get('interactive'):
+            self._bulk_busy += 1
+        return token, chosen, enqueued, message
+
+    def _finish(self, token, elapsed=None):
+        """Release a worker taken by _next_message (caller holds the lock)"""
+        priority, _, sender = self._in_flight.pop(token)
+        self._busy_senders.discard(sender)
+        if not self.classes[priority].get('interactive'):
+            self._bulk_busy -= 1
+        if elapsed is not None:
+            self._service_time[priority] = 0.8 * self._service_time[priority] + 0.2 * elapsed
+        if any(self._queues.values()):
+            # A bulk slot or this sender's next message may now be runnable
+            self._condition.notify()
+        elif not self._in_flight:
+            self._idle.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                item = self._next_message()
+                while item is None:
+                    if not self._running:
+                        return
+                    self._condition.wait()
+                    item = self._next_message()
+            token, priority, enqueued, message = item
+
+            elapsed = None
+            try:
+                waited = self.clock() - enqueued
+                QUEUE_WAIT_SECONDS.observe(waited, priority=priority)
+                if waited > self.classes[priority]['deadline']:
+                    ADMISSION_DECISIONS.inc(priority=priority, decision='expired')
+                    sender = message.get('from')
+                    with self._lock:
+                        # Same once-per-sender rule as submit()
+                        if sender not in self._overload_notified:
+                            self._overload_notified.add(sender)
+                            self._queue_notice(sender, SHED_MESSAGE)
+                    continue
+
+                started = self.clock()
+                try:
+                    self.handler(message)
+                except Exception as e:
+                    print(f"Error in admission worker: {e}")
+                elapsed = self.clock() - started
+            finally:
+                with self._lock:
+                    self._finish(token, elapsed)
+
+    def _notifier(self):
+        while True:
+            notice = self._notices.get()
+            if notice is None:
+                return
+            sender, text = notice
+            try:
+                self.notify(sender, text)
+            except Exception as e:
+                print(f"Error sending notice: {e}")
@@ -1,3 +1,4 @@
+import os
 import time
 import random
 from groq import Groq
@@ -5,26 +6,44 @@ import cohere
 import requests
 from together import Together
 
+from services.metrics import REGISTRY
+
+PROVIDER_SECONDS = REGISTRY.histogram(
+    'ai_provider_request_seconds', 'Latency of AI provider calls', ['provider'])
+PROVIDER_ERRORS = REGISTRY.counter(
+    'ai_provider_errors_total', 'Failed AI provider calls', ['provider'])
+PROVIDER_QUOTA = REGISTRY.gauge(
+    'ai_provider_quota_remaining', 'Requests left in the current rate limit window', ['provider'])
+
 class AIManager:
-    def __init__(self):
+    def __init__(self, clients=None):
+        # Pre-built clients (e.g. benchmark fakes) take precedence over real ones
+        clients = clients or {}
         self.providers = {
             'groq': {
-                'client': Groq(api_key=os.getenv('GROQ_API_KEY')),
+                'client': clients.get('groq') or Groq(api_key=os.getenv('GROQ_API_KEY')),
                 'rate_limit': {'requests': 0, 'window_start': time.time(), 'max_per_minute': 60},
                 'model': 'mixtral-8x7b-32768'
             },
             'together': {
-                'client': Together(api_key=os.getenv('TOGETHER_API_KEY')),
+                'client': clients.get('together') or Together(api_key=os.getenv('TOGETHER_API_KEY')),
                 'rate_limit': {'requests': 0, 'window_start': time.time(), 'max_per_minute': 50},
                 'model': 'mistralai/Mixtral-8x7B-Instruct-v0.1'
             },
             'cohere': {
-                'client': cohere.Client(os.getenv('COHERE_API_KEY')),
+                'client': clients.get('cohere') or cohere.Client(os.getenv('COHERE_API_KEY')),
                 'rate_limit': {'requests': 0, 'window_start': time.time(), 'max_per_minute': 20},
                 'model': 'command-r'
             }
         }
         self.current_provider = 'groq'
+        for provider_name in self.providers:
+            self._update_quota(provider_name)
+    
+    def _update_quota(self, provider_name):
+        """Publish remaining requests in the provider's rate limit window"""
+        rate_limit = self.providers[provider_name]['rate_limit']
+        PROVIDER_QUOTA.set(rate_limit['max_per_minute'] - rate_limit['requests'], provider=provider_name)
     
     def _check_rate_limit(self, provider_name):
         """Check if provider is within rate limits"""
@@ -35,6 +54,7 @@ class AIManager:
         if current_time - provider['rate_limit']['window_start'] > 60:
             provider['rate_limit']['requests'] = 0
             provider['rate_limit']['window_start'] = current_time
+            self._update_quota(provider_name)
         
         return provider['rate_limit']['requests'] < provider['rate_limit']['max_per_minute']
     
@@ -58,10 +78,12 @@ class AIManager:
     def _increment_usage(self, provider_name):
         """Increment usage counter for provider"""
         self.providers[provider_name]['rate_limit']['requests'] += 1
+        self._update_quota(provider_name)
     
     async def generate_response(self, message, context="", max_retries=3):
         """Generate response using available AI provider"""
         for attempt in range(max_retries):
+            provider_name = None
             try:
                 provider_name = self._get_available_provider()
                 provider = self.providers[provider_name]
@@ -74,6 +96,7 @@ User message: {message}
 Please provide a helpful response. If the information is not available in the provided context, clearly state "This information is not available in the provided documents" and then provide a general response based on your knowledge."""
 
                 # Generate response based on provider
+                started = time.perf_counter()
                 if provider_name == 'groq':
                     response = provider['client'].chat.completions.create(
                         messages=[{"role": "user", "content": full_prompt}],
@@ -100,11 +123,13 @@ Please provide a helpful response. If the information is not available in the pr
                     )
                     result = response.text
                 
+                PROVIDER_SECONDS.observe(time.perf_counter() - started, provider=provider_name)
                 self._increment_usage(provider_name)
                 return result, provider_name
                 
             except Exception as e:
                 print(f"Error with {provider_name}: {e}")
+                PROVIDER_ERRORS.inc(provider=provider_name or 'none')
                 if attempt < max_retries - 1:
                     time.sleep(1)
                     continue
@@ -116,6 +141,7 @@ Please provide a helpful response. If the information is not available in the pr
         try:
             if self._check_rate_limit('groq'):
                 client = self.providers['groq']['client']
+                started = time.perf_counter()
                 response = client.chat.completions.create(
                     model="llava-v1.5-7b-4096-preview",
                     messages=[{
@@ -127,9 +153,11 @@ Please provide a helpful response. If the information is not available in the pr
                     }],
                     max_tokens=1000
                 )
+                PROVIDER_SECONDS.observe(time.perf_counter() - started, provider='groq')
                 self._increment_usage('groq')
                 return response.choices[0].message.content
             else:
                 return "Image processing temporarily unavailable due to rate limits. Please try again later."
         except Exception as e:
+            PROVIDER_ERRORS.inc(provider='groq')
             return f"Error processing image: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import re
+import threading
+
+# Heavy libraries (torch, sentence_transformers, onnxruntime, numpy) are only
+# imported inside the backends that need them, on first use.
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+class SentenceTransformerBackend:
+    """Original SentenceTransformer embeddings (PyTorch)"""
+    name = 'sentence-transformers'
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, texts, batch_size=32):
+        """Encode texts into a float32 matrix of shape (len(texts), dim)"""
+        model = self._model or self._load()
+        embeddings = model.encode(list(texts), batch_size=batch_size)
+        return embeddings.astype('float32')
+
+
+class OnnxMiniLMBackend:
+    """int8-quantized MiniLM running on ONNX Runtime (no PyTorch needed)
+
+    Expects an exported and quantized model plus its tokenizer.json, e.g. the
+    `onnx/model_quantized.onnx` and `tokenizer.json` files published for
+    sentence-transformers/all-MiniLM-L6-v2.
+    """
+    name = 'onnx-int8'
+
+    def __init__(self, model_dir, num_threads=0, max_length=256):
+        if not model_dir:
+            raise ValueError("OnnxMiniLMBackend needs model_dir (Config.EMBEDDING_ONNX_DIR)")
+        self.model_path = os.path.join(model_dir, 'model_quantized.onnx')
+        self.tokenizer_path = os.path.join(model_dir, 'tokenizer.json')
+        self.num_threads = num_threads
+        self.max_length = max_length
+        self._session = None
+        self._tokenizer = None
+        self._input_names = ()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._session is None:
+                import onnxruntime as ort
+                from tokenizers import Tokenizer
+
+                tokenizer = Tokenizer.from_file(self.tokenizer_path)
+                tokenizer.enable_truncation(max_length=self.max_length)
+                tokenizer.enable_padding()
+
+                options = ort.SessionOptions()
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                if self.num_threads:
+                    options.intra_op_num_threads = self.num_threads
+                session = ort.InferenceSession(
+                    self.model_path, options, providers=['CPUExecutionProvider'])
+
+                self._input_names = {i.name for i in session.get_inputs()}
+                self._tokenizer = tokenizer
+                self._session = session
+        return self._session
+
+    def encode(self, texts, batch_size=32):
+        """Encode texts into a float32 matrix of shape (len(texts), dim)"""
+        import numpy as np
+
+        session = self._session or self._load()
+        texts = list(texts)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self._tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encoded], dtype='int64')
+            attention_mask = np.array([e.attention_mask for e in encoded], dtype='int64')
+            feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            if 'token_type_ids' in self._input_names:
+                feeds['token_type_ids'] = np.zeros_like(input_ids)
+
+            token_embeddings = session.run(None, feeds)[0]
+
+            # Mean pooling over real tokens, same as SentenceTransformer
+            mask = attention_mask[..., None].astype('float32')
+            summed = (token_embeddings * mask).sum(axis=1)
+            batches.append(summed / np.clip(mask.sum(axis=1), 1e-9, None))
+
+        if not batches:
+            return np.zeros((0, 384), dtype='float32')
+        return np.vstack(batches).astype('float32')
+
+
+class HashingBackend:
+    """Deterministic bag-of-words hashing embeddings for tests and benchmarks"""
+    name = 'hashing'
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+
+    def encode(self, texts, batch_size=32):
+        """Encode texts into a float32 matrix of shape (len(texts), dim)"""
+        import numpy as np
+
+        texts = list(texts)
+        embeddings = np.zeros((len(texts), self.dimension), dtype='float32')
+        for row, text in enumerate(texts):
+            for token in re.findall(r'\w+', text.lower()):
+                digest = hashlib.md5(token.encode('utf-8')).digest()
+                bucket = int.from_bytes(digest[:4], 'little') % self.dimension
+                embeddings[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        return embeddings
+
+
+BACKENDS = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    OnnxMiniLMBackend.name: OnnxMiniLMBackend,
+    HashingBackend.name: HashingBackend,
+}
+
+_backend_cache = {}
+_backend_cache_lock = threading.Lock()
+
+
+def get_embedding_backend(name=SentenceTransformerBackend.name, onnx_dir=None, num_threads=0):
+    """Return the shared embedding backend instance for `name`
+
+    Instances are shared so every user's knowledge base reuses the same
+    loaded model. `onnx_dir` and `num_threads` only apply to the ONNX backend
+    and are used when it is first created.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+
+    with _backend_cache_lock:
+        if name not in _backend_cache:
+            if name == OnnxMiniLMBackend.name:
+                _backend_cache[name] = OnnxMiniLMBackend(model_dir=onnx_dir, num_threads=num_threads)
+            else:
+                _backend_cache[name] = BACKENDS[name]()
+        return _backend_cache[name]
@@ -17,6 +17,12 @@ class FileProcessor:
             'application/msword',
             'text/plain'
         ]
+        # Types process_document can actually extract text from
+        self.extractable_doc_types = [
+            'application/pdf',
+            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            'text/plain'
+        ]
     
     def download_whatsapp_media(self, media_id):
         """Download media from WhatsApp servers"""
@@ -85,7 +91,7 @@ class FileProcessor:
             return text.strip()
         except Exception as e:
             print(f"Error extracting PDF text: {e}")
-            return f"Error reading PDF: {str(e)}"
+            return None
     
     def extract_text_from_docx(self, docx_data):
         """Extract text from DOCX"""
@@ -97,10 +103,13 @@ class FileProcessor:
             return text.strip()
         except Exception as e:
             print(f"Error extracting DOCX text: {e}")
-            return f"Error reading DOCX: {str(e)}"
+            return None
     
     def process_document(self, doc_data, mime_type, filename="document"):
-        """Process document and store in Drive"""
+        """Process document and store in Drive
+
+        Returns None if the type is not extractable or extraction failed.
+        """
         try:
             # Extract text based on type
             if mime_type == 'application/pdf':
@@ -110,7 +119,11 @@ class FileProcessor:
             elif mime_type == 'text/plain':
                 text_content = doc_data.decode('utf-8', errors='ignore')
             else:
-                text_content = f"Unsupported document type: {mime_type}"
+                print(f"Unsupported document type: {mime_type}")
+                return None
+            
+            if text_content is None:
+                return None
             
             # Store original in Drive
             file_id = self.drive_storage.upload_file(
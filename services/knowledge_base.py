@@ -1,20 +1,34 @@
 import json
-from sentence_transformers import SentenceTransformer
-import faiss
-import numpy as np
-import nltk
-from nltk.tokenize import sent_tokenize
+import threading
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+from services.embeddings import get_embedding_backend
+
+# faiss and nltk are imported on first use so workers that never touch
+# documents don't pay for them at startup.
+_punkt_checked = False
+_punkt_lock = threading.Lock()
+
+def sent_tokenize(text):
+    """Split text into sentences, downloading NLTK punkt data on first use"""
+    global _punkt_checked
+    import nltk
+
+    if not _punkt_checked:
+        with _punkt_lock:
+            if not _punkt_checked:
+                # Newer NLTK releases load punkt_tab instead of punkt
+                for resource in ('punkt', 'punkt_tab'):
+                    try:
+                        nltk.data.find(f'tokenizers/{resource}')
+                    except LookupError:
+                        nltk.download(resource)
+                _punkt_checked = True
+    return nltk.tokenize.sent_tokenize(text)
 
 class KnowledgeBase:
-    def __init__(self, drive_storage):
+    def __init__(self, drive_storage, embedding_backend=None):
         self.drive_storage = drive_storage
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.model = embedding_backend or get_embedding_backend()
         self.index = None
         self.documents = []
         
@@ -40,6 +54,8 @@ class KnowledgeBase:
         if not self.documents:
             return
         
+        import faiss
+
         texts = [doc['text'] for doc in self.documents]
         embeddings = self.model.encode(texts)
         
@@ -56,6 +72,8 @@ class KnowledgeBase:
         if not self.index or not self.documents:
             return []
         
+        import faiss
+
         # Encode query
         query_embedding = self.model.encode([query])
         faiss.normalize_L2(query_embedding)
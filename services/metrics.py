@@ -0,0 +1,247 @@
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def get(self, **labels):
+        """Current value for a label set (0 if never recorded)"""
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def get(self, **labels):
+        """(count, sum) observed for a label set"""
+        state = self._values.get(self._key(labels))
+        return (state['count'], state['sum']) if state else (0, 0.0)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, {'counts': list(v['counts']), 'sum': v['sum'], 'count': v['count']})
+                           for k, v in self._values.items())
+        for labelvalues, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state['counts']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """Render every metric in Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'whatsapp_bot_stage_seconds', 'Time spent in each message handling stage', ['stage'])
+
+
+def span(stage):
+    """Time a block of the message hot path, e.g. `with span('retrieval'):`"""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+class SlowRequestProfiler:
+    """Sampling profiler that reports where slow requests spent their time
+
+    While a request is being profiled, a single background thread samples the
+    stack of the thread running it every `interval` seconds. If the request
+    takes longer than `threshold_ms`, the most common stacks are printed.
+    A threshold of 0 disables profiling.
+    """
+
+    def __init__(self, threshold_ms=0, interval=0.005, top=5):
+        self.threshold = threshold_ms / 1000.0
+        self.interval = interval
+        self.top = top
+        self._active = {}
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+                active = list(self._active.items())
+            frames = sys._current_frames()
+            stacks = []
+            for token, (thread_id, _) in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stacks.append((token, ''.join(traceback.format_stack(frame, limit=15))))
+            # Only record into requests that are still running; profile()
+            # reads its samples once it has removed itself under the lock
+            with self._lock:
+                for token, stack in stacks:
+                    if token in self._active:
+                        self._active[token][1][stack] += 1
+            time.sleep(self.interval)
+
+    @contextmanager
+    def profile(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        token = object()
+        samples = StackCounter()
+        with self._lock:
+            self._active[token] = (threading.get_ident(), samples)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+                self._sampler.start()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._active.pop(token, None)
+            if elapsed > self.threshold and samples:
+                self._report(name, elapsed, samples)
+
+    def _report(self, name, elapsed, samples):
+        total = sum(samples.values())
+        print(f"Slow request {name}: {elapsed * 1000:.0f}ms, {total} samples")
+        for stack, count in samples.most_common(self.top):
+            print(f"--- {count}/{total} samples ---\n{stack}")
+
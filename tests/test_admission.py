@@ -0,0 +1,165 @@
+import os
+
+from services.admission import (
+    AdmissionController, TokenBucket, BUSY_MESSAGE, PRIORITY_CLASSES, SHED_MESSAGE
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ManualController(AdmissionController):
+    """Controller that never starts threads; tests drive _next_message by hand"""
+
+    def start(self):
+        self._running = True
+        self._started_pid = os.getpid()
+
+
+def make_controller(classes=None, workers=4, **kwargs):
+    clock = FakeClock()
+    controller = ManualController(
+        handler=lambda message: None, notify=lambda sender, text: None,
+        workers=workers, max_requests_per_minute=1000, classes=classes, clock=clock, **kwargs
+    )
+    return controller, clock
+
+
+def message(sender, message_type='text'):
+    return {'from': sender, 'type': message_type}
+
+
+def pending_notices(controller):
+    notices = []
+    while not controller._notices.empty():
+        notices.append(controller._notices.get_nowait())
+    return notices
+
+
+def test_token_bucket_limits_and_refills():
+    bucket = TokenBucket(3, period=60, now=0)
+    assert [bucket.try_consume(now=0) for _ in range(4)] == [True, True, True, False]
+    # One token comes back every 20 seconds
+    assert not bucket.try_consume(now=10)
+    assert bucket.try_consume(now=30)
+    assert not bucket.try_consume(now=30)
+
+
+def test_rate_limited_sender_gets_one_notice():
+    controller, _ = make_controller()
+    controller.max_requests_per_minute = 2
+    decisions = [controller.submit(message('a')) for _ in range(4)]
+    assert decisions == ['queued', 'queued', 'rate_limited', 'rate_limited']
+    assert len(pending_notices(controller)) == 1
+
+
+def test_weighted_round_robin_order():
+    controller, _ = make_controller(workers=100)
+    for index in range(6):
+        controller.submit(message(f"t{index}", 'text'))
+    for index in range(3):
+        controller.submit(message(f"i{index}", 'image'))
+    controller.submit(message('d0', 'document'))
+
+    order = [controller._next_message()[1] for _ in range(10)]
+    assert order == ['text', 'image', 'text', 'text', 'image', 'text', 'document', 'text', 'image', 'text']
+    assert controller._next_message() is None
+
+
+def test_busy_and_shed_thresholds():
+    classes = {'text': {'weight': 1, 'busy_after': 2, 'deadline': 4, 'interactive': True}}
+    controller, _ = make_controller(classes=classes, workers=1)
+    # Each queued message adds its 1s estimated service time to the wait
+    decisions = [controller.submit(message(f"u{index}")) for index in range(6)]
+    assert decisions == ['queued', 'queued', 'queued', 'busy', 'busy', 'shed']
+    assert pending_notices(controller) == [('u3', BUSY_MESSAGE), ('u4', BUSY_MESSAGE), ('u5', SHED_MESSAGE)]
+
+
+def test_busy_notice_sent_once_per_sender():
+    classes = {'text': {'weight': 1, 'busy_after': 0.5, 'deadline': 100, 'interactive': True}}
+    controller, _ = make_controller(classes=classes, workers=1)
+    decisions = [controller.submit(message('a')) for _ in range(4)]
+    assert decisions == ['queued', 'busy', 'busy', 'busy']
+    assert pending_notices(controller) == [('a', BUSY_MESSAGE)]
+
+
+def test_in_flight_work_counts_towards_wait():
+    classes = {
+        'text': {'weight': 6, 'busy_after': 1, 'deadline': 30, 'interactive': True},
+        'document': {'weight': 1, 'busy_after': 30, 'deadline': 300, 'interactive': False},
+    }
+    controller, clock = make_controller(classes=classes, workers=1)
+    controller._service_time['document'] = 2.0
+    controller.submit(message('a', 'document'))
+    controller._next_message()
+
+    # The only worker is busy on a 2s document, so text has to wait for it
+    assert controller.submit(message('b', 'text')) == 'busy'
+    clock.now += 1.5
+    assert controller._expected_wait('text', clock.now) == 1.5
+
+
+def test_one_worker_stays_free_for_text():
+    controller, _ = make_controller(workers=2)
+    controller.submit(message('a', 'document'))
+    controller.submit(message('b', 'document'))
+    assert controller._next_message()[1] == 'document'
+    # The second document must wait: bulk classes only get workers - 1
+    assert controller._next_message() is None
+
+    assert controller.submit(message('c', 'text')) == 'queued'
+    token, priority, _, _ = controller._next_message()
+    assert priority == 'text'
+
+    with controller._lock:
+        controller._finish(token, elapsed=0.1)
+    assert controller._next_message() is None
+
+
+def test_same_sender_messages_never_overlap():
+    controller, _ = make_controller()
+    first = message('a')
+    second = message('a')
+    controller.submit(first)
+    controller.submit(second)
+    controller.submit(message('b'))
+
+    token, _, _, taken = controller._next_message()
+    assert taken is first
+    # a's second message waits for the first; b's is not blocked behind it
+    assert controller._next_message()[3]['from'] == 'b'
+    assert controller._next_message() is None
+
+    with controller._lock:
+        controller._finish(token, elapsed=0.1)
+    assert controller._next_message()[3] is second
+
+
+def test_expired_message_respects_notice_dedupe():
+    controller, clock = make_controller(workers=1)
+    handled = []
+    controller.handler = handled.append
+    controller.submit(message('a'))
+    controller.submit(message('b'))
+    controller._overload_notified.add('a')
+    clock.now += PRIORITY_CLASSES['text']['deadline'] + 1
+
+    # Run a worker inline; it returns once the queue is empty
+    controller._running = False
+    controller._worker()
+    assert handled == []
+    assert pending_notices(controller) == [('b', SHED_MESSAGE)]
+
+def test_idle_buckets_are_evicted():
+    controller, clock = make_controller()
+    controller.submit(message('a'))
+    assert 'a' in controller._buckets
+    clock.now += 61
+    controller.submit(message('b'))
+    assert 'a' not in controller._buckets
+    assert 'b' in controller._buckets
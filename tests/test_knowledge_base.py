@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('faiss')
+nltk = pytest.importorskip('nltk')
+
+from services.embeddings import HashingBackend
+from services.knowledge_base import KnowledgeBase
+
+
+@pytest.fixture(autouse=True)
+def require_punkt():
+    # The knowledge base downloads punkt on first use; don't hit the network here
+    try:
+        nltk.tokenize.sent_tokenize("One. Two.")
+    except LookupError:
+        pytest.skip('nltk punkt data is not installed')
+
+
+def test_hashing_backend_is_deterministic():
+    backend = HashingBackend(dimension=64)
+    first = backend.encode(['Refunds need manager approval.'])
+    second = backend.encode(['Refunds need manager approval.'])
+    assert first.shape == (1, 64)
+    assert (first == second).all()
+
+
+def test_add_document_and_search_with_hashing_backend():
+    kb = KnowledgeBase(drive_storage=None, embedding_backend=HashingBackend())
+    kb.add_document(
+        "Refunds above five hundred dollars must be approved by the finance manager. "
+        "The office is open from nine to five on weekdays and on Saturday mornings.",
+        {'type': 'document', 'filename': 'policy.txt'}
+    )
+    assert len(kb.documents) == 2
+
+    results = kb.search("who approves refunds above five hundred dollars", min_similarity=0.1)
+    assert results
+    assert 'Refunds' in results[0]['text']
+    assert results[0]['metadata']['filename'] == 'policy.txt'
+    assert 'policy.txt' in kb.get_context_for_query("refunds approved by the finance manager")